@@ -2,9 +2,8 @@
 Main scientific agent workflow using LangGraph.
 """
 
-import os
+import asyncio
 import urllib3
-from dotenv import load_dotenv
 from langgraph.graph import END, StateGraph
 
 # Change from relative to absolute imports
@@ -23,7 +22,6 @@ from scientifc_agent.utils import print_stream
 
 # Disable insecure request warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-load_dotenv()
 
 
 def create_agent_workflow():
@@ -90,15 +88,19 @@ test_inputs = [
 ]
 
 async def run_test_inputs():
-    """Run the agent on the test inputs."""
-    outputs = []
-    for test_input in test_inputs:
-        final_answer = await print_stream(app, test_input)
-        outputs.append(final_answer.content)
-    return outputs
+    """Run the agent on all test inputs concurrently."""
+    final_answers = await asyncio.gather(*[
+        print_stream(app, test_input, task_label=f"test-{i + 1}")
+        for i, test_input in enumerate(test_inputs)
+    ])
+    return [final_answer.content for final_answer in final_answers]
 
 # This allows running the agent directly or importing it as a module
 if __name__ == "__main__":
-    import asyncio
+    # API keys may live only in .env; load it (without overriding real
+    # environment variables) before the first LLM or CORE call. Library
+    # importers are unaffected — loading stays off the import path.
+    from dotenv import load_dotenv
+    load_dotenv()
     asyncio.run(run_test_inputs())
 
@@ -0,0 +1,45 @@
+"""
+Targeted instrumentation callbacks for the scientific agent.
+
+LangChain's global set_debug(True) serializes and logs the full payload
+of every chained call, which is both noisy and slow. When all we want
+to know is where the time goes, a callback handler that records LLM
+call durations answers that at a negligible cost.
+"""
+
+import time
+from collections import Counter
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+class TimingHandler(BaseCallbackHandler):
+    """Records wall-clock duration and count per LLM, keyed by model name."""
+
+    def __init__(self) -> None:
+        self._starts: dict = {}
+        self.totals: Counter = Counter()
+        self.calls: Counter = Counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        self._starts[run_id] = ((serialized or {}).get("name", "llm"), time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        started = self._starts.pop(run_id, None)
+        if started is None:
+            return
+        name, start_time = started
+        self.totals[name] += time.perf_counter() - start_time
+        self.calls[name] += 1
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        # Failed calls still cost time; account for them the same way.
+        self.on_llm_end(None, run_id=run_id, **kwargs)
+
+    def report(self) -> str:
+        """Render the collected timings as one line per model."""
+        if not self.calls:
+            return "No LLM calls recorded."
+        return "\n".join(
+            f"{name}: {self.calls[name]} call(s), {self.totals[name]:.2f}s total"
+            for name in sorted(self.calls)
+        )
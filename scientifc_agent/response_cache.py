@@ -0,0 +1,135 @@
+"""
+Semantic response cache for whole agent runs.
+
+Research queries repeat heavily ("find recent papers about X"), and each
+run costs several LLM round-trips plus CORE searches. This cache embeds
+the user query with a small sentence-transformer, searches a FAISS index
+of prior queries, and returns the stored final answer when the best
+match clears a high cosine-similarity threshold — short-circuiting the
+entire graph.
+
+Opt-in via SCIAGENT_RESPONSE_CACHE=1 and entirely optional: if
+sentence-transformers or faiss is not installed the cache silently
+reports misses. The index and the answers sidecar are persisted under
+~/.cache/scientific-agent/ so hits survive across processes.
+"""
+
+import os
+import pickle
+from pathlib import Path
+from typing import Optional
+
+from langchain_core.messages import BaseMessage
+
+_CACHE_DIR = Path.home() / ".cache" / "scientific-agent"
+_INDEX_PATH = _CACHE_DIR / "responses.faiss"
+_SIDECAR_PATH = _CACHE_DIR / "responses.pkl"
+
+_EMBEDDING_DIM = 384
+_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Only near-identical queries are served from cache; anything below the
+# threshold runs the full graph.
+_DIRECT_HIT_THRESHOLD = 0.95
+# Below this many vectors a flat float index is used; once reached, the
+# index is rebuilt as an int8 scalar quantizer trained on the stored
+# embeddings, quartering the memory per vector.
+_QUANTIZE_THRESHOLD = 64
+
+_enabled = os.environ.get("SCIAGENT_RESPONSE_CACHE") == "1"
+_unavailable = False
+_model = None
+_index = None
+_responses: list = []
+_embeddings = None
+
+def _build_index(faiss, vectors):
+    """Build the index for the given (possibly empty) embedding matrix.
+
+    A flat float index is exact but stores 4 bytes per dimension; once
+    enough vectors exist to train on, an int8 scalar quantizer gets the
+    same inner-product search at a quarter of the footprint.
+    """
+    if vectors is not None and len(vectors) >= _QUANTIZE_THRESHOLD:
+        index = faiss.IndexScalarQuantizer(
+            _EMBEDDING_DIM, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(vectors)
+        index.add(vectors)
+        return index
+    index = faiss.IndexFlatIP(_EMBEDDING_DIM)
+    if vectors is not None and len(vectors):
+        index.add(vectors)
+    return index
+
+def _ensure_loaded() -> bool:
+    """Lazy-load the embedding model and index; False when disabled/unavailable."""
+    global _unavailable, _model, _index, _responses, _embeddings
+    if not _enabled or _unavailable:
+        return False
+    if _model is not None and _index is not None:
+        return True
+    try:
+        import faiss
+        import numpy as np
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        _unavailable = True
+        return False
+    try:
+        _model = SentenceTransformer(_EMBEDDING_MODEL)
+        _responses = []
+        _embeddings = np.empty((0, _EMBEDDING_DIM), dtype="float32")
+        if _INDEX_PATH.exists() and _SIDECAR_PATH.exists():
+            with open(_SIDECAR_PATH, "rb") as f:
+                sidecar = pickle.load(f)
+            if isinstance(sidecar, dict):
+                _responses = sidecar["responses"]
+                _embeddings = sidecar["embeddings"]
+                _index = faiss.read_index(str(_INDEX_PATH))
+                return True
+            # Older sidecars stored only the answers, without the raw
+            # embeddings needed to retrain the quantizer; start fresh.
+        _index = _build_index(faiss, _embeddings)
+        return True
+    except Exception as e:
+        print(f"Warning: response cache unavailable: {e}")
+        _unavailable = True
+        return False
+
+def _embed(query: str):
+    import faiss
+    vector = _model.encode([query]).astype("float32")
+    faiss.normalize_L2(vector)
+    return vector
+
+def lookup(query: str) -> Optional[BaseMessage]:
+    """Return the cached final answer for a semantically identical query."""
+    if not _ensure_loaded() or _index.ntotal == 0:
+        return None
+    similarities, indices = _index.search(_embed(query), 1)
+    if similarities[0][0] >= _DIRECT_HIT_THRESHOLD:
+        return _responses[indices[0][0]]
+    return None
+
+def store(query: str, response: BaseMessage) -> None:
+    """Add a (query, final answer) pair to the cache and persist it."""
+    global _index, _embeddings
+    if not _ensure_loaded():
+        return
+    try:
+        import faiss
+        import numpy as np
+        vector = _embed(query)
+        _embeddings = np.vstack([_embeddings, vector])
+        _responses.append(response)
+        if isinstance(_index, faiss.IndexFlatIP) and len(_embeddings) >= _QUANTIZE_THRESHOLD:
+            # Enough vectors to train on: switch to the quantized index.
+            _index = _build_index(faiss, _embeddings)
+        else:
+            _index.add(vector)
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        faiss.write_index(_index, str(_INDEX_PATH))
+        with open(_SIDECAR_PATH, "wb") as f:
+            pickle.dump({"responses": _responses, "embeddings": _embeddings}, f)
+    except Exception as e:
+        print(f"Warning: could not persist response cache: {e}")
@@ -6,38 +6,63 @@ This script should be run from the root directory.
 
 import asyncio
 import os
-from dotenv import load_dotenv
-from langchain_core.globals import set_debug # Import the correct function
+import sys
+from functools import lru_cache
 
-# Enable LangChain debug mode
-set_debug(True) # Use the imported function
+from dotenv import dotenv_values
 
-# Load environment variables from .env file
-load_dotenv()
 
-# Import after loading environment variables
-from scientifc_agent.models import CoreAPIWrapper
+@lru_cache(maxsize=1)
+def _load_env() -> bool:
+    """Load .env into the process environment, once.
+
+    load_dotenv() re-reads and re-parses the file on every call; this
+    parses it a single time, applies values via setdefault so real
+    environment variables keep precedence, and lets lru_cache make any
+    repeat call free.
+    """
+    for key, value in dotenv_values().items():
+        if value is not None:
+            os.environ.setdefault(key, value)
+    return True
+
+
+# The agent package constructs its LLM clients at import time, so keys
+# kept only in .env must be in the environment before the import below.
+# lru_cache keeps this a single parse even though main() calls it again.
+_load_env()
+
+from scientifc_agent.models import configure_core
 from scientifc_agent.agent import app
 from scientifc_agent.utils import print_stream
 
-# Set the API key for CoreAPIWrapper from environment
-core_api_key_env = os.environ.get("CORE_API_KEY") 
-if not core_api_key_env:
-    raise ValueError("CORE_API_KEY environment variable is not set. Please set it in your .env file.")
-CoreAPIWrapper.api_key = core_api_key_env
-
 
 async def main():
     """Run the scientific agent with a user query."""
+    # Load environment variables from .env file
+    _load_env()
+
+    # Validate the CORE API key up front and freeze it into the
+    # process-wide config instead of mutating a class attribute.
+    core_api_key_env = os.environ.get("CORE_API_KEY")
+    if not core_api_key_env:
+        print("Error: CORE_API_KEY is not set. Add it to your environment or .env file.", file=sys.stderr)
+        sys.exit(1)
+    configure_core(core_api_key_env)
+
     user_query = input("Enter your research query: ")
     if not user_query:
         user_query = "Find recent papers (2023-2024) about large language models for scientific research"
         print(f"Using default query: {user_query}")
-    
+
+    # A stable session id lets follow-up runs resume the conversation
+    # history and keeps the prompt prefix cache-friendly on the provider.
+    session_id = os.environ.get("SCIAGENT_SESSION_ID")
+
     print("\n" + "-" * 50 + "\n")
-    
+
     # Run the agent
-    final_state_message = await print_stream(app, user_query)
+    final_state_message = await print_stream(app, user_query, session_id=session_id)
     
     print("\n" + "-" * 50 + "\n")
     print("Final output message content:")
@@ -50,4 +75,11 @@ async def main():
         print("No answer received")
 
 if __name__ == "__main__":
+    # uvloop handles the socket-heavy tool traffic noticeably faster
+    # than the stdlib loop; fall back silently when it isn't installed.
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""
+Client-side tokenizer caching for context-window accounting.
+
+Tokenizing is pure CPU work that repeats on identical bytes every turn:
+the static system prompts never change, and a growing conversation
+shares its whole prefix with the previous turn. Two cache levels avoid
+re-doing it:
+
+- L0: exact-match cache from text hash -> encoded token IDs, for
+  byte-identical inputs like the system prompts.
+- L1: prefix cache at message boundaries -> cumulative token counts,
+  so counting a conversation only tokenizes the new tail.
+
+tiktoken is loaded lazily; if it is unavailable a chars/4 estimate is
+used so context accounting still works without the dependency.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage
+
+_L0_MAX_ENTRIES = 256
+_l0_cache: "OrderedDict[bytes, List[int]]" = OrderedDict()
+
+_L1_MAX_ENTRIES = 256
+_l1_cache: "OrderedDict[bytes, int]" = OrderedDict()
+
+_encoder = None
+_encoder_unavailable = False
+
+def _get_encoder():
+    global _encoder, _encoder_unavailable
+    if _encoder is None and not _encoder_unavailable:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoder_unavailable = True
+    return _encoder
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content
+    return content if isinstance(content, str) else str(content)
+
+def encode(text: str) -> Optional[List[int]]:
+    """Tokenize text, reusing the L0 cache for repeated inputs.
+
+    Returns None when no tokenizer is available.
+    """
+    data = text.encode("utf-8", errors="replace")
+    key = _digest(data)
+    cached = _l0_cache.get(key)
+    if cached is not None:
+        _l0_cache.move_to_end(key)
+        return cached
+
+    encoder = _get_encoder()
+    if encoder is None:
+        return None
+
+    tokens = encoder.encode(text)
+    if len(_l0_cache) >= _L0_MAX_ENTRIES:
+        _l0_cache.popitem(last=False)
+    _l0_cache[key] = tokens
+    return tokens
+
+def count_tokens(text: str) -> int:
+    """Count tokens in a string, falling back to a chars/4 estimate."""
+    tokens = encode(text)
+    if tokens is None:
+        return len(text) // 4
+    return len(tokens)
+
+def count_messages_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Count tokens across a message sequence using L1 prefix sums.
+
+    The running hash advances at each message boundary; a conversation
+    that extends a previously counted one hits the cache for the shared
+    prefix and only tokenizes the new messages.
+    """
+    running = hashlib.blake2b(digest_size=16)
+    total = 0
+    for message in messages:
+        text = _message_text(message)
+        running.update(_digest(text.encode("utf-8", errors="replace")))
+        prefix_key = running.digest()
+        cached = _l1_cache.get(prefix_key)
+        if cached is not None:
+            _l1_cache.move_to_end(prefix_key)
+            total = cached
+            continue
+        total += count_tokens(text)
+        if len(_l1_cache) >= _L1_MAX_ENTRIES:
+            _l1_cache.popitem(last=False)
+        _l1_cache[prefix_key] = total
+    return total
+
+# Warm the L0 cache with the static prompts so the first turn's context
+# accounting only tokenizes the new user message.
+from scientifc_agent.prompts import (
+    DECISION_MAKING_PROMPT,
+    PLANNING_PROMPT_STATIC_PREFIX,
+    AGENT_PROMPT,
+    JUDGE_PROMPT
+)
+
+for _prompt in (DECISION_MAKING_PROMPT, PLANNING_PROMPT_STATIC_PREFIX, AGENT_PROMPT, JUDGE_PROMPT):
+    count_tokens(_prompt)
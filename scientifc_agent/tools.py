@@ -3,18 +3,44 @@ Tool definitions and implementations for the scientific agent.
 """
 
 import io
-import json
 import os
 import time
 import urllib3
 import pdfplumber
-from langchain_core.tools import BaseTool, tool
+from langchain_core.tools import BaseTool, StructuredTool, tool
 from typing import Optional
 
 from scientifc_agent.models import CoreAPIWrapper, SearchPapersInput
 
-@tool("search-papers", args_schema=SearchPapersInput)
-def search_papers(query: str, max_papers: int = 1) -> str:
+# Memoized search results keyed by (cache version, normalized query, top_k).
+# The judge->planning feedback loop tends to re-issue the same searches;
+# a cache hit replaces a full CORE round-trip. Only successful result
+# lists are cached — errors and empty-result strings always retry.
+_SEARCH_CACHE: dict = {}
+_SEARCH_CACHE_MAX_SIZE = 256
+_search_cache_version = 0
+
+def _search_cache_key(query: str, max_papers: int) -> tuple:
+    normalized_query = " ".join(query.lower().split())
+    return (_search_cache_version, normalized_query, max_papers)
+
+def clear_search_cache() -> None:
+    """Invalidate memoized search results by bumping the cache version.
+
+    Called when the judge asks for a better answer, so a re-planned
+    search is allowed to fetch fresh results.
+    """
+    global _search_cache_version
+    _search_cache_version += 1
+
+def _search_cache_put(key: tuple, result) -> None:
+    if not isinstance(result, list):
+        return
+    if len(_SEARCH_CACHE) >= _SEARCH_CACHE_MAX_SIZE:
+        _SEARCH_CACHE.pop(next(iter(_SEARCH_CACHE)))
+    _SEARCH_CACHE[key] = result
+
+def _search_papers(query: str, max_papers: int = 1) -> str:
     """Search for scientific papers using the CORE API.
 
     Example:
@@ -24,10 +50,35 @@ def search_papers(query: str, max_papers: int = 1) -> str:
         A list of the relevant papers found with the corresponding relevant information.
     """
     try:
-        return CoreAPIWrapper(top_k_results=max_papers).search(query)
+        key = _search_cache_key(query, max_papers)
+        if key in _SEARCH_CACHE:
+            return _SEARCH_CACHE[key]
+        result = CoreAPIWrapper(top_k_results=max_papers).search(query)
+        _search_cache_put(key, result)
+        return result
     except Exception as e:
         return f"Error performing paper search: {e}"
 
+async def _asearch_papers(query: str, max_papers: int = 1) -> str:
+    """Async implementation of search-papers using the shared httpx client."""
+    try:
+        key = _search_cache_key(query, max_papers)
+        if key in _SEARCH_CACHE:
+            return _SEARCH_CACHE[key]
+        result = await CoreAPIWrapper(top_k_results=max_papers).asearch(query)
+        _search_cache_put(key, result)
+        return result
+    except Exception as e:
+        return f"Error performing paper search: {e}"
+
+# Expose both sync and async paths so tool.ainvoke performs non-blocking I/O
+search_papers = StructuredTool.from_function(
+    func=_search_papers,
+    coroutine=_asearch_papers,
+    name="search-papers",
+    args_schema=SearchPapersInput,
+)
+
 @tool("download-paper")
 def download_paper(url: str) -> str:
     """Download a specific scientific paper from a given URL.
@@ -2,64 +2,260 @@
 Utility functions for the scientific agent.
 """
 
+import asyncio
 import json
+import os
+import sys
+from pathlib import Path
 from typing import Optional
-from langchain_core.messages import BaseMessage, HumanMessage # Import HumanMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage, messages_from_dict, messages_to_dict # Import HumanMessage
 from langchain_core.tools import BaseTool
-from IPython.display import display, Markdown
 from langgraph.graph.state import CompiledStateGraph
 
+from scientifc_agent import response_cache
+from scientifc_agent.callbacks import TimingHandler
+from scientifc_agent.tokenizer_cache import count_messages_tokens
+
+# IPython's display machinery only adds value inside a notebook; in a
+# plain CLI run it drags in a heavy import and renders Markdown objects
+# as their repr. Detect the notebook once at import and fall back to
+# buffered stdout writes otherwise.
+_IN_NOTEBOOK = "ipykernel" in sys.modules
+if _IN_NOTEBOOK:
+    from IPython.display import display, Markdown
+
+def _display_markdown(text: str) -> None:
+    """Render a markdown snippet in a notebook, or write it to stdout."""
+    if _IN_NOTEBOOK:
+        display(Markdown(text))
+    else:
+        sys.stdout.write(text + "\n")
+        sys.stdout.flush()
+
+# Session histories persisted on disk, keyed by session id. Resuming a
+# session replays the committed history as a stable prefix, which both
+# preserves context across runs and keeps the prompt prefix byte-stable
+# for provider-side KV-cache reuse.
+_SESSIONS_DIR = Path.home() / ".cache" / "scientific-agent" / "sessions"
+
+def _load_session_messages(session_id: str) -> list[BaseMessage]:
+    """Load the persisted message history for a session, if any."""
+    path = _SESSIONS_DIR / f"{session_id}.json"
+    try:
+        with open(path, encoding="utf-8") as f:
+            return messages_from_dict(json.load(f))
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        print(f"Warning: could not load session '{session_id}': {e}")
+        return []
+
+def _save_session_messages(session_id: str, messages: list[BaseMessage]) -> None:
+    """Persist a session's message history to disk."""
+    try:
+        _SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
+        path = _SESSIONS_DIR / f"{session_id}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(messages_to_dict(messages), f)
+    except Exception as e:
+        print(f"Warning: could not save session '{session_id}': {e}")
+
+# The tool set is effectively immutable at runtime, but tool.args runs
+# pydantic schema introspection on every access; memoize the rendered
+# description keyed by the (sorted) tool names.
+_TOOLS_DESC_CACHE: dict = {}
+
 def format_tools_description(tools: list[BaseTool]) -> str:
     """Format the tools description for use in prompts.
-    
+
     Args:
         tools: List of tools
-        
+
     Returns:
         Formatted string with tool descriptions
     """
-    return "\n\n".join([f"- {tool.name}: {tool.description}\n Input arguments: {tool.args}" for tool in tools])
+    # Sort by name so the rendered description is byte-stable regardless
+    # of tool registration order — reordering would otherwise invalidate
+    # provider prompt caches.
+    cache_key = tuple(sorted(tool.name for tool in tools))
+    cached = _TOOLS_DESC_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    description = "\n\n".join([f"- {tool.name}: {tool.description}\n Input arguments: {tool.args}" for tool in sorted(tools, key=lambda t: t.name)])
+    _TOOLS_DESC_CACHE[cache_key] = description
+    return description
+
+# Long feedback loops accumulate plans, tool dumps and retries; past a
+# point the middle of the history adds latency and cost (and crowds the
+# context window) without changing the outcome.
+_HISTORY_MAX_TOKENS = 8000
+# Messages kept verbatim at the tail: roughly the last three
+# human/AI exchanges.
+_HISTORY_KEEP_RECENT = 6
+
+def compact_history(messages: list[BaseMessage], max_tokens: int = _HISTORY_MAX_TOKENS) -> list[BaseMessage]:
+    """Compact a message history that exceeds the token budget.
+
+    Keeps the original user query (the first message) and the most
+    recent messages verbatim, replacing everything in between with a
+    single placeholder SystemMessage. Histories under the budget are
+    returned unchanged, so the common case costs one cached token
+    count.
 
-async def print_stream(app: CompiledStateGraph, user_input_str: str) -> Optional[BaseMessage]: # Renamed 'input' to 'user_input_str'
+    Args:
+        messages: The conversation history
+        max_tokens: Token budget above which the middle is elided
+
+    Returns:
+        The original list, or a compacted copy
+    """
+    if len(messages) <= _HISTORY_KEEP_RECENT + 1:
+        return messages
+    if count_messages_tokens(messages) <= max_tokens:
+        return messages
+
+    tail_start = len(messages) - _HISTORY_KEEP_RECENT
+    # A ToolMessage must stay adjacent to the AI message that issued the
+    # tool call; widen the tail until it no longer starts mid-exchange.
+    while tail_start > 1 and isinstance(messages[tail_start], ToolMessage):
+        tail_start -= 1
+    elided = messages[1:tail_start]
+    if not elided:
+        return messages
+    placeholder = SystemMessage(
+        content=f"[{len(elided)} earlier messages (previous plans, tool outputs and "
+                "feedback) were elided to fit the context window. The latest messages "
+                "below reflect the current state of the task.]"
+    )
+    return [messages[0], placeholder] + messages[tail_start:]
+
+def _is_cacheable_answer(message: Optional[BaseMessage]) -> bool:
+    """Whether a streamed message qualifies as a cacheable final answer."""
+    return (
+        isinstance(message, AIMessage)
+        and isinstance(message.content, str)
+        and bool(message.content)
+        and not getattr(message, "tool_calls", None)
+    )
+
+async def print_stream(app: CompiledStateGraph, user_input_str: str, task_label: Optional[str] = None, session_id: Optional[str] = None) -> Optional[BaseMessage]: # Renamed 'input' to 'user_input_str'
     """Stream the results of the agent's execution.
-    
+
     Args:
         app: The compiled state graph
         user_input_str: The user input string
-        
+        task_label: Optional label prefixed to the output headers, so
+            interleaved output from concurrent runs stays readable
+        session_id: Optional stable conversation id. When set, the
+            session's prior messages are replayed as a prefix, the id is
+            forwarded as prompt_cache_key for provider cache routing,
+            and the updated history is persisted afterwards.
+
     Returns:
         The last message from the agent's execution
     """
-    display(Markdown("## New research running"))
-    display(Markdown(f"### Input:\n\n{user_input_str}\n\n"))
-    display(Markdown("### Stream:\n\n"))
+    label_prefix = f"[{task_label}] " if task_label else ""
+    _display_markdown(f"## {label_prefix}New research running")
+    _display_markdown(f"### {label_prefix}Input:\n\n{user_input_str}\n\n")
+
+    # A near-identical query may already have a cached final answer;
+    # serving it skips the whole graph (and all its LLM/API calls).
+    # Sessions carry prior context that could change the answer, so
+    # they always run the graph.
+    if not session_id:
+        cached_response = response_cache.lookup(user_input_str)
+        if cached_response is not None:
+            _display_markdown(f"### {label_prefix}Cached answer:\n\n")
+            cached_response.pretty_print()
+            return cached_response
 
-    all_messages = []
-    # Wrap the initial user input string in a HumanMessage
+    _display_markdown(f"### {label_prefix}Stream:\n\n")
+
+    # Only the most recent streamed message is kept; retaining the whole
+    # stream would grow memory with every turn for no reason. The full
+    # history is only accumulated when it must be persisted for a session.
+    last_message: Optional[BaseMessage] = None
+    # Wrap the initial user input string in a HumanMessage, appended
+    # after any committed history so the prefix never mutates.
     initial_messages_for_graph = [HumanMessage(content=user_input_str)]
+    config = {}
+    session_messages = None
+    if session_id:
+        initial_messages_for_graph = _load_session_messages(session_id) + initial_messages_for_graph
+        config["metadata"] = {"prompt_cache_key": session_id}
+        session_messages = list(initial_messages_for_graph)
+    # Per-LLM wall-clock timings on request, instead of the firehose
+    # that set_debug(True) used to produce.
+    timing_handler = None
+    if os.environ.get("SCIAGENT_DEBUG") == "1":
+        timing_handler = TimingHandler()
+        config["callbacks"] = [timing_handler]
+    config = config or None
+    # Rendering (pretty_print formatting plus terminal writes) runs on a
+    # separate consumer task fed through a bounded queue, so the graph
+    # keeps executing while earlier messages are still being printed.
+    # The bound keeps memory flat if rendering falls behind; None is the
+    # end-of-stream sentinel.
+    render_queue: asyncio.Queue = asyncio.Queue(maxsize=16)
+
+    async def _render_messages() -> None:
+        while True:
+            message = await render_queue.get()
+            if message is None:
+                break
+            try:
+                if isinstance(message, BaseMessage):
+                    # pretty_print formats and writes synchronously; push it
+                    # off the event loop so it never stalls the graph.
+                    await asyncio.to_thread(message.pretty_print)
+                else:
+                    # This case should ideally not happen
+                    print(f"Streaming a non-BaseMessage object: {message}")
+                print("\n\n")
+            except Exception as e:
+                # A render failure is cosmetic; keep draining so the
+                # producer never blocks on the bounded queue.
+                print(f"Error rendering message: {e}")
+
+    renderer = asyncio.create_task(_render_messages())
+    stream_failed = False
     try:
-        async for chunk in app.astream({"messages": initial_messages_for_graph}, stream_mode="updates"):
+        async for chunk in app.astream({"messages": initial_messages_for_graph}, config=config, stream_mode="updates"):
             for component_name, updates_from_component in chunk.items(): # Iterate through components in the chunk
-                if messages := updates_from_component.get("messages"):
-                    # messages here are the new messages *from this update step*
-                    # all_messages should store the complete sequence from the state if needed,
-                    # or just the messages printed. For returning the last message, this is fine.
-                    all_messages.extend(messages) 
-                    for message in messages:
-                        if isinstance(message, BaseMessage):
-                            message.pretty_print()
-                        else:
-                            # This case should ideally not happen
-                            print(f"Streaming a non-BaseMessage object: {message}")
-                        print("\n\n")
+                messages = updates_from_component.get("messages")
+                if not messages:
+                    continue
+                # messages here are the new messages *from this update step*
+                last_message = messages[-1]
+                if session_messages is not None:
+                    session_messages.extend(messages)
+                for message in messages:
+                    await render_queue.put(message)
     except Exception as e:
+        stream_failed = True
         print(f"Error during streaming: {str(e)}")
         print("This could be due to API issues or model configuration problems.")
-        
-    if not all_messages:
-        return None
-    
-    # Return the very last message object that was part of the stream's updates
+    finally:
+        await render_queue.put(None)
+        await renderer
+
+    if session_id:
+        # A failed run leaves a partial transcript (dangling tool calls,
+        # plan fragments); committing it would replay the breakage as
+        # the prefix of every later run in this session.
+        if not stream_failed:
+            _save_session_messages(session_id, session_messages)
+    elif _is_cacheable_answer(last_message) and not stream_failed:
+        # Only a final answer from a run that completed cleanly may be
+        # cached; a failed stream leaves whatever intermediate message
+        # (a plan, a tool summary, judge feedback) was last streamed,
+        # and persisting that would serve it for every similar query.
+        response_cache.store(user_input_str, last_message)
+
+    if timing_handler is not None:
+        _display_markdown(f"### {label_prefix}LLM timings:\n\n{timing_handler.report()}\n")
+
     # Note: If the error happens mid-LLM call, this might not be the "final AI answer"
     # but the last piece of state updated.
-    return all_messages[-1]
\ No newline at end of file
+    return last_message
\ No newline at end of file